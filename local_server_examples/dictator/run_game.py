@@ -18,7 +18,10 @@ async def main():
 
     load_dotenv()
 
-    game_specs = create_game_from_specs(money_available=10.0, exchange_rate=3.0)
+    # Game creation writes the specs file, so keep it off the event loop
+    game_specs = await asyncio.to_thread(
+        create_game_from_specs, money_available=10.0, exchange_rate=3.0
+    )
     login_payloads = [
         {"type": "join", "gameId": game_specs["game_id"], "recovery": code}
         for code in game_specs["recovery_codes"]
@@ -54,4 +57,9 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        import uvloop
+    except ImportError:  # uvloop is not available on Windows
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
@@ -1,10 +1,11 @@
-import json
 import logging
-import uuid
+import secrets
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
+import orjson
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -15,7 +16,7 @@ logger = logging.getLogger(__name__)
 
 def generate_recovery_codes(num_players: int = 2) -> list[str]:
     """Generate recovery codes for the specified number of players."""
-    return [str(uuid.uuid4()) for _ in range(num_players)]
+    return [secrets.token_hex(16) for _ in range(num_players)]
 
 
 def save_game_data(
@@ -25,7 +26,8 @@ def save_game_data(
     num_players: int, 
     recovery_codes: list[str],
     money_available: float = 10.0,
-    exchange_rate: float = 3.0
+    exchange_rate: float = 3.0,
+    created_at: Optional[datetime] = None,
 ) -> Path:
     """Save game data to a JSON file in the specs/games directory."""
     specs_dir = specs_path.parent / "games"
@@ -38,13 +40,12 @@ def save_game_data(
         "recovery_codes": recovery_codes,
         "money_available": money_available,
         "exchange_rate": exchange_rate,
-        "created_at": datetime.now().isoformat(),
+        "created_at": (created_at or datetime.now()).isoformat(),
     }
 
     output_file = specs_dir / f"game_{game_id}.json"
     try:
-        with output_file.open("w") as f:
-            json.dump(game_data, f, indent=2)
+        output_file.write_bytes(orjson.dumps(game_data, option=orjson.OPT_INDENT_2))
         logger.info(f"Game data saved to {output_file}")
     except Exception as e:
         logger.error(f"Failed to save game data: {e}")
@@ -56,8 +57,10 @@ def save_game_data(
 def create_game_from_specs(money_available: float = 10.0, exchange_rate: float = 3.0) -> dict:
     """Create a new Dictator game from specs."""
     try:
-        game_id = int(datetime.now().timestamp())
-        game_name = f"Dictator Game {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        now = datetime.now()
+        # Nanosecond ids stay unique when several games are created in one second
+        game_id = time.time_ns()
+        game_name = f"Dictator Game {now:%Y-%m-%d %H:%M:%S}"
         recovery_codes = generate_recovery_codes(num_players=2)
 
         save_game_data(
@@ -68,6 +71,7 @@ def create_game_from_specs(money_available: float = 10.0, exchange_rate: float =
             recovery_codes=recovery_codes,
             money_available=money_available,
             exchange_rate=exchange_rate,
+            created_at=now,
         )
 
         return {
@@ -77,7 +81,7 @@ def create_game_from_specs(money_available: float = 10.0, exchange_rate: float =
             "recovery_codes": recovery_codes,
             "money_available": money_available,
             "exchange_rate": exchange_rate,
-            "created_at": datetime.now().isoformat(),
+            "created_at": now.isoformat(),
         }
 
     except Exception as e:
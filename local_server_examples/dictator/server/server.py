@@ -1,9 +1,11 @@
 import asyncio
-import json
 import logging
+import os
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
+import orjson
 import websockets
 from websockets.asyncio.server import serve, ServerConnection
 from dotenv import load_dotenv
@@ -11,7 +13,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 logging.basicConfig(
-    level=logging.INFO,
+    level=os.environ.get("LOG_LEVEL", "INFO").upper(),
     format="%(asctime)s [%(levelname)s] %(message)s",
     handlers=[
         logging.StreamHandler(),
@@ -24,33 +26,54 @@ DECISION_PHASE = "decision"
 PAYOUT_PHASE = "payout"
 FINISHED = "finished"
 
+ROLES = ("dictator", "receiver")
+PHASE_NAMES = {1: DECISION_PHASE, 2: PAYOUT_PHASE}
+ROLE_DISPLAY_NAMES = {"dictator": "Dictator", "receiver": "Receiver"}
+
 SPECS_PATH = Path(__file__).parent / "games"
 
 
+def encode_shared_event(event_type: str, data: Dict[str, Any]) -> bytes:
+    """Encode an event whose data is shared by all players, leaving the data open."""
+    return b'{"type":"event","eventType":%s,"data":%s' % (
+        orjson.dumps(event_type),
+        orjson.dumps(data)[:-1],
+    )
+
+
+def finish_event(shared: bytes, fields: Dict[str, Any]) -> bytes:
+    """Complete a shared event with the data fields specific to one player."""
+    return shared + b"," + orjson.dumps(fields)[1:] + b"}"
+
+
+@dataclass(slots=True)
 class DictatorGame:
     """Represents a single Dictator game."""
 
-    def __init__(
-        self, game_id: int, money_available: float = 10.0, exchange_rate: float = 3.0
-    ):
-        self.game_id = game_id
-        self.players: dict[str, Optional[ServerConnection]] = {}
-        self.player_names: dict[str, str] = {}
-        self.player_recovery_codes: dict[str, str] = {}
-        self.state = WAITING
-        self.current_phase = 0
-        self.money_available = money_available
-        self.exchange_rate = exchange_rate
-        self.money_sent = 0.0
-        self.dictator_decision_made = False
-        self.players_done: dict[str, bool] = {}
+    game_id: int
+    money_available: float = 10.0
+    exchange_rate: float = 3.0
+    players: dict[str, Optional[ServerConnection]] = field(
+        default_factory=dict, init=False
+    )
+    player_names: dict[str, str] = field(default_factory=dict, init=False)
+    player_recovery_codes: dict[str, str] = field(default_factory=dict, init=False)
+    state: str = field(default=WAITING, init=False)
+    current_phase: int = field(default=0, init=False)
+    money_sent: float = field(default=0.0, init=False)
+    dictator_decision_made: bool = field(default=False, init=False)
+    players_done: dict[str, bool] = field(
+        default_factory=lambda: dict.fromkeys(ROLES, False), init=False
+    )
+    # Number of True entries in players_done
+    done_count: int = field(default=0, init=False)
 
     def add_player(self, role: str, websocket: ServerConnection, name: str):
         """Add a player to the game."""
         self.players[role] = websocket
         self.player_names[role] = name
         self.players_done[role] = False
-        logger.info(f"Added {role} ({name}) to game {self.game_id}")
+        logger.info("Added %s (%s) to game %s", role, name, self.game_id)
 
     def is_ready(self) -> bool:
         """Check if the game is ready to start (has both dictator and receiver)."""
@@ -67,7 +90,7 @@ class DictatorGame:
 
         self.money_sent = money_send
         self.dictator_decision_made = True
-        logger.info(f"Dictator decided to send {money_send} in game {self.game_id}")
+        logger.info("Dictator decided to send %s in game %s", money_send, self.game_id)
 
     def calculate_payouts(self) -> Dict[str, float]:
         """Calculate the payouts for both players."""
@@ -78,12 +101,14 @@ class DictatorGame:
 
     def mark_player_done(self, role: str) -> None:
         """Mark a player as done with the current phase."""
-        self.players_done[role] = True
-        logger.info(f"Player {role} marked as done in game {self.game_id}")
+        if not self.players_done[role]:
+            self.players_done[role] = True
+            self.done_count += 1
+        logger.info("Player %s marked as done in game %s", role, self.game_id)
 
     def all_players_done(self) -> bool:
         """Check if all players are done with the current phase."""
-        return all(self.players_done.values())
+        return self.done_count == len(self.players_done)
 
     @property
     def num_players(self) -> int:
@@ -91,6 +116,15 @@ class DictatorGame:
         return len(self.players.keys())
 
 
+@dataclass
+class PlayerConnection:
+    """A client connection and the game seat it has claimed."""
+
+    websocket: ServerConnection
+    game: Optional[DictatorGame] = None
+    player_role: Optional[str] = None
+
+
 class DictatorServer:
     """WebSocket server for the Dictator game experiment."""
 
@@ -98,156 +132,178 @@ class DictatorServer:
         self.host = host
         self.port = port
         self.games: Dict[int, DictatorGame] = {}
+        # Game specs never change once created, so each file is read only once
+        self.game_specs: Dict[int, Dict[str, Any]] = {}
+        # Encoded messages waiting to be sent, one queue per connection
+        self.outboxes: Dict[ServerConnection, asyncio.Queue] = {}
+        self.message_handlers = {
+            "join": self.handle_join,
+            "decision": self.handle_decision,
+            "action": self.handle_action,
+        }
 
     async def handle_websocket(self, websocket: ServerConnection) -> None:
         """Handle WebSocket connections."""
-        game = None
-        player_role = None
+        connection = PlayerConnection(websocket)
+        outbox = self.outboxes[websocket] = asyncio.Queue()
+        writer = asyncio.create_task(self.write_messages(websocket, outbox))
 
         try:
             async for message in websocket:
                 try:
-                    data = json.loads(message)
-                    logger.debug(f"Message: {data}")
+                    data = orjson.loads(message)
+                    logger.debug("Message: %s", data)
                     msg_type = data.get("type", "")
 
-                    if msg_type == "join":
-                        game_id = data.get("gameId")
-                        recovery = data.get("recovery")
-
-                        if not game_id and not recovery:
-                            await self.send_error(
-                                websocket, "Game ID and recovery code are required"
-                            )
-                            continue
-
-                        game_specs_path = SPECS_PATH / f"game_{game_id}.json"
-
-                        if not game_specs_path.exists():
-                            await self.send_error(
-                                websocket, f"Game {game_id} does not exist"
-                            )
-                            continue
-
-                        with game_specs_path.open("r") as f:
-                            game_specs = json.load(f)
-
-                        if recovery not in game_specs["recovery_codes"]:
-                            await self.send_error(
-                                websocket, f"Invalid recovery code: {recovery}"
-                            )
-                            continue
-
-                        if game_id in self.games:
-                            game = self.games[game_id]
-                        else:
-                            game = DictatorGame(
-                                game_id,
-                                game_specs.get("money_available", 10.0),
-                                game_specs.get("exchange_rate", 3.0),
-                            )
-                            self.games[game_id] = game
-
-                        if game.num_players >= 2:
-                            await self.send_error(websocket, f"Game {game_id} is full")
-                            continue
-
-                        recovery_index = game_specs["recovery_codes"].index(recovery)
-                        player_role = "dictator" if recovery_index == 0 else "receiver"
-
-                        if player_role in game.players:
-                            await self.send_error(
-                                websocket, f"Role {player_role} already taken"
-                            )
-                            continue
-
-                        player_name = player_role.capitalize()
-                        game.add_player(player_role, websocket, player_name)
-                        await self.send_assign_role_message(
-                            websocket, player_name, player_role
-                        )
-
-                        if game.is_ready():
-                            await self.start_game(game)
-
-                    elif msg_type == "decision":
-                        if not game or not player_role:
-                            await self.send_error(websocket, "Game not found")
-                            continue
-
-                        if game.state != DECISION_PHASE:
-                            await self.send_error(
-                                websocket, "Game not in decision phase"
-                            )
-                            continue
-
-                        if player_role != "dictator":
-                            await self.send_error(
-                                websocket, "Only dictator can make decisions"
-                            )
-                            continue
-
-                        try:
-                            money_send = data.get("money_send")
-                            if money_send is None:
-                                await self.send_error(
-                                    websocket, "money_send is required"
-                                )
-                                continue
-
-                            game.record_decision(float(money_send))
-                            await self.process_decision_completion(game)
-                        except ValueError as e:
-                            await self.send_error(websocket, str(e))
-                            continue
-
-                    elif msg_type == "action":
-                        if not game or not player_role:
-                            await self.send_error(websocket, "Game not found")
-                            continue
-
-                        action = data.get("action")
-                        if action == "done":
-                            game.mark_player_done(player_role)
-
-                            # Check if all players are done with phase 2
-                            if game.state == PAYOUT_PHASE and game.all_players_done():
-                                await self.end_game(game)
-                        else:
-                            await self.send_error(
-                                websocket, f"Unknown action: {action}"
-                            )
-
-                    else:
+                    handler = self.message_handlers.get(msg_type)
+                    if handler is None:
                         await self.send_error(
                             websocket, f"Unknown message type: {msg_type}"
                         )
+                    else:
+                        await handler(connection, data)
 
-                except json.JSONDecodeError:
+                except orjson.JSONDecodeError:
                     await self.send_error(websocket, "Invalid JSON message")
                 except Exception as e:
-                    logger.exception(f"Error handling message: {e}")
+                    logger.exception("Error handling message: %s", e)
                     await self.send_error(websocket, f"Error: {str(e)}")
 
         except websockets.exceptions.ConnectionClosed:
-            logger.info(f"Connection closed for {player_role}")
+            logger.info("Connection closed for %s", connection.player_role)
         finally:
+            writer.cancel()
+            self.outboxes.pop(websocket, None)
+            game = connection.game
+            player_role = connection.player_role
             if game and player_role is not None:
                 if player_role in game.players:
                     game.players[player_role] = None
-                logger.info(f"{player_role} disconnected from game {game.game_id}")
+                logger.info("%s disconnected from game %s", player_role, game.game_id)
+
+    async def handle_join(self, connection: PlayerConnection, data: dict) -> None:
+        """Handle a player joining a game with a recovery code."""
+        websocket = connection.websocket
+        game_id = data.get("gameId")
+        recovery = data.get("recovery")
+
+        if not game_id and not recovery:
+            await self.send_error(websocket, "Game ID and recovery code are required")
+            return
+
+        game_specs = self.load_game_specs(game_id)
+
+        if game_specs is None:
+            await self.send_error(websocket, f"Game {game_id} does not exist")
+            return
+
+        recovery_index = game_specs["recovery_index"].get(recovery)
+        if recovery_index is None:
+            await self.send_error(websocket, f"Invalid recovery code: {recovery}")
+            return
+
+        if game_id in self.games:
+            game = self.games[game_id]
+        else:
+            game = DictatorGame(
+                game_id,
+                game_specs.get("money_available", 10.0),
+                game_specs.get("exchange_rate", 3.0),
+            )
+            self.games[game_id] = game
+        connection.game = game
+
+        if game.num_players >= 2:
+            await self.send_error(websocket, f"Game {game_id} is full")
+            return
+
+        player_role = "dictator" if recovery_index == 0 else "receiver"
+        connection.player_role = player_role
+
+        if player_role in game.players:
+            await self.send_error(websocket, f"Role {player_role} already taken")
+            return
+
+        player_name = ROLE_DISPLAY_NAMES[player_role]
+        game.add_player(player_role, websocket, player_name)
+        await self.send_assign_role_message(websocket, player_name, player_role)
+
+        if game.is_ready():
+            await self.start_game(game)
+
+    async def handle_decision(self, connection: PlayerConnection, data: dict) -> None:
+        """Handle the dictator's decision."""
+        websocket = connection.websocket
+        game = connection.game
+        player_role = connection.player_role
+
+        if not game or not player_role:
+            await self.send_error(websocket, "Game not found")
+            return
+
+        if game.state != DECISION_PHASE:
+            await self.send_error(websocket, "Game not in decision phase")
+            return
+
+        if player_role != "dictator":
+            await self.send_error(websocket, "Only dictator can make decisions")
+            return
+
+        try:
+            money_send = data.get("money_send")
+            if money_send is None:
+                await self.send_error(websocket, "money_send is required")
+                return
+
+            game.record_decision(float(money_send))
+            await self.process_decision_completion(game)
+        except ValueError as e:
+            await self.send_error(websocket, str(e))
+
+    async def handle_action(self, connection: PlayerConnection, data: dict) -> None:
+        """Handle a player action."""
+        websocket = connection.websocket
+        game = connection.game
+        player_role = connection.player_role
+
+        if not game or not player_role:
+            await self.send_error(websocket, "Game not found")
+            return
+
+        action = data.get("action")
+        if action == "done":
+            game.mark_player_done(player_role)
+
+            # Check if all players are done with phase 2
+            if game.state == PAYOUT_PHASE and game.all_players_done():
+                await self.end_game(game)
+        else:
+            await self.send_error(websocket, f"Unknown action: {action}")
+
+    def load_game_specs(self, game_id: int) -> Optional[Dict[str, Any]]:
+        """Load the specs of a game, reading its file on first use only."""
+        game_specs = self.game_specs.get(game_id)
+        if game_specs is None:
+            game_specs_path = SPECS_PATH / f"game_{game_id}.json"
+            if not game_specs_path.is_file():
+                return None
+            game_specs = orjson.loads(game_specs_path.read_bytes())
+            # Player index by recovery code, so joins need no list scan
+            game_specs["recovery_index"] = {
+                code: i for i, code in enumerate(game_specs["recovery_codes"])
+            }
+            self.game_specs[game_id] = game_specs
+        return game_specs
 
     async def start_game(self, game: DictatorGame) -> None:
         """Start a new game."""
         game.state = DECISION_PHASE
         game.current_phase = 1
 
-        for role, websocket in game.players.items():
-            if websocket:
-                await self.send_game_started(websocket, game, role)
+        await self.send_game_started(game)
 
         logger.info(
-            f"Game {game.game_id} started with players {list(game.players.keys())}"
+            "Game %s started with players %s", game.game_id, list(game.players.keys())
         )
 
     async def process_decision_completion(self, game: DictatorGame) -> None:
@@ -258,24 +314,45 @@ class DictatorServer:
         # Reset players_done for phase 2
         for role in game.players_done:
             game.players_done[role] = False
+        game.done_count = 0
 
         payouts = game.calculate_payouts()
 
         # Send phase-started event for phase 2
-        for role, websocket in game.players.items():
-            if websocket:
-                await self.send_phase_started(websocket, game, role)
+        await self.send_phase_started(game)
 
         # Send decision results
-        for role, websocket in game.players.items():
-            if websocket:
-                await self.send_decision_result(websocket, game, role, payouts)
+        await self.send_decision_result(game, payouts)
+
+    async def write_messages(
+        self, websocket: ServerConnection, outbox: asyncio.Queue
+    ) -> None:
+        """Send a client's queued messages in order."""
+        try:
+            while True:
+                message = await outbox.get()
+                await websocket.send(message)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        except Exception:
+            logger.exception("Failed to send message, closing connection")
+            await websocket.close(1011, "Internal error")
+        finally:
+            # Nothing drains this outbox any more, so stop queueing messages to it
+            if self.outboxes.get(websocket) is outbox:
+                del self.outboxes[websocket]
+
+    async def send_encoded(self, websocket: ServerConnection, payload: bytes) -> None:
+        """Queue an already encoded message for a client."""
+        outbox = self.outboxes.get(websocket)
+        if outbox is not None:
+            outbox.put_nowait(payload)
 
     async def send_message(
         self, websocket: ServerConnection, message: Dict[str, Any]
     ) -> None:
-        """Send a message to a client."""
-        await websocket.send(json.dumps(message))
+        """Queue a message for a client."""
+        await self.send_encoded(websocket, orjson.dumps(message))
 
     async def send_error(self, websocket: ServerConnection, error_message: str) -> None:
         """Send an error message to a client."""
@@ -303,109 +380,113 @@ class DictatorServer:
             },
         )
 
-    async def send_game_started(
-        self, websocket: ServerConnection, game: DictatorGame, role: str
-    ) -> None:
-        """Send a game-started message to a player."""
-        await self.send_message(
-            websocket,
+    def encode_phase_started(self, game: DictatorGame) -> bytes:
+        """Encode the part of a phase-started message shared by all players."""
+        return encode_shared_event(
+            "phase-started",
             {
-                "type": "event",
-                "eventType": "game-started",
-                "data": {
-                    "game_id": game.game_id,
-                    "role": role,
-                    "money_available": game.money_available,
-                    "exchange_rate": game.exchange_rate,
-                },
+                "gameId": game.game_id,
+                "phase": game.current_phase,
+                "phase_name": PHASE_NAMES[game.current_phase],
             },
         )
 
-        await self.send_phase_started(websocket, game, role)
-
-    async def send_phase_started(
-        self, websocket: ServerConnection, game: DictatorGame, role: str
-    ) -> None:
-        """Send a phase-started message to a player."""
-        await self.send_message(
-            websocket,
+    async def send_game_started(self, game: DictatorGame) -> None:
+        """Send game-started and phase-started messages to all players."""
+        game_started = encode_shared_event(
+            "game-started",
             {
-                "type": "event",
-                "eventType": "phase-started",
-                "data": {
-                    "gameId": game.game_id,
-                    "phase": game.current_phase,
-                    "phase_name": "decision" if game.current_phase == 1 else "payout",
-                    "role": role,
-                },
+                "game_id": game.game_id,
+                "money_available": game.money_available,
+                "exchange_rate": game.exchange_rate,
             },
         )
+        phase_started = self.encode_phase_started(game)
+
+        for role, websocket in game.players.items():
+            if websocket:
+                await self.send_encoded(
+                    websocket, finish_event(game_started, {"role": role})
+                )
+                await self.send_encoded(
+                    websocket, finish_event(phase_started, {"role": role})
+                )
+
+    async def send_phase_started(self, game: DictatorGame) -> None:
+        """Send a phase-started message to all players."""
+        phase_started = self.encode_phase_started(game)
+
+        for role, websocket in game.players.items():
+            if websocket:
+                await self.send_encoded(
+                    websocket, finish_event(phase_started, {"role": role})
+                )
 
     async def send_decision_result(
-        self,
-        websocket: ServerConnection,
-        game: DictatorGame,
-        role: str,
-        payouts: Dict[str, float],
+        self, game: DictatorGame, payouts: Dict[str, float]
     ) -> None:
-        """Send a decision-result message to a player."""
-        await self.send_message(
-            websocket,
+        """Send a decision-result message to all players."""
+        decision_result = encode_shared_event(
+            "decision-result",
             {
-                "type": "event",
-                "eventType": "decision-result",
-                "data": {
-                    "gameId": game.game_id,
-                    "money_sent": game.money_sent,
-                    "money_available": game.money_available,
-                    "exchange_rate": game.exchange_rate,
-                    "payouts": payouts,
-                    "payout": payouts[role],
-                },
+                "gameId": game.game_id,
+                "money_sent": game.money_sent,
+                "money_available": game.money_available,
+                "exchange_rate": game.exchange_rate,
+                "payouts": payouts,
             },
         )
 
+        for role, websocket in game.players.items():
+            if websocket:
+                await self.send_encoded(
+                    websocket, finish_event(decision_result, {"payout": payouts[role]})
+                )
+
     async def send_game_ended(
-        self,
-        websocket: ServerConnection,
-        game: DictatorGame,
-        role: str,
-        payouts: Dict[str, float],
+        self, game: DictatorGame, payouts: Dict[str, float]
     ) -> None:
-        """Send a game-ended message to a player."""
-        await self.send_message(
-            websocket,
+        """Send a game-ended message to all players."""
+        game_ended = encode_shared_event(
+            "game-over",
             {
-                "type": "event",
-                "eventType": "game-over",
-                "data": {
-                    "gameId": game.game_id,
-                    "role": role,
-                    "money_sent": game.money_sent,
-                    "money_available": game.money_available,
-                    "exchange_rate": game.exchange_rate,
-                    "payouts": payouts[role],
-                },
+                "gameId": game.game_id,
+                "money_sent": game.money_sent,
+                "money_available": game.money_available,
+                "exchange_rate": game.exchange_rate,
             },
         )
 
+        for role, websocket in game.players.items():
+            if websocket:
+                await self.send_encoded(
+                    websocket,
+                    finish_event(game_ended, {"role": role, "payouts": payouts[role]}),
+                )
+
     async def end_game(self, game: DictatorGame) -> None:
         """End the game after all players are done with phase 2."""
         game.state = FINISHED
         payouts = game.calculate_payouts()
 
         # Send game ended to all players
-        for role, websocket in game.players.items():
-            if websocket:
-                await self.send_game_ended(websocket, game, role, payouts)
+        await self.send_game_ended(game, payouts)
 
-        logger.info(f"Game {game.game_id} ended with payouts: {payouts}")
+        logger.info("Game %s ended with payouts: %s", game.game_id, payouts)
 
     async def start_server(self) -> None:
         """Start the WebSocket server."""
-        async with serve(self.handle_websocket, self.host, self.port):
+        # Game messages are small JSON documents, where per-message deflate costs
+        # more than it saves
+        async with serve(
+            self.handle_websocket,
+            self.host,
+            self.port,
+            compression=None,
+            max_size=2**16,
+        ):
             logger.info(
-                f"Dictator game WebSocket server started on {self.host}:{self.port}"
+                "Dictator game WebSocket server started on %s:%s", self.host, self.port
             )
             await asyncio.Future()
 
@@ -420,6 +501,11 @@ if __name__ == "__main__":
     host = "localhost"
     port = 8765
 
-    logger.info(f"Starting Dictator game WebSocket server on {host}:{port}")
+    logger.info("Starting Dictator game WebSocket server on %s:%s", host, port)
 
-    asyncio.run(DictatorServer.run(host, port))
+    try:
+        import uvloop
+    except ImportError:  # uvloop is not available on Windows
+        asyncio.run(DictatorServer.run(host, port))
+    else:
+        uvloop.run(DictatorServer.run(host, port))
@@ -70,4 +70,9 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        import uvloop
+    except ImportError:  # uvloop is not available on Windows
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
@@ -1,10 +1,10 @@
-import json
 import logging
-import uuid
+import secrets
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
+import orjson
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -15,7 +15,7 @@ logger = logging.getLogger(__name__)
 
 def generate_recovery_codes(num_players: int = 4) -> list[str]:
     """Generate recovery codes for the specified number of players."""
-    return [str(uuid.uuid4()) for _ in range(num_players)]
+    return [secrets.token_hex(16) for _ in range(num_players)]
 
 
 def save_game_data(
@@ -25,7 +25,8 @@ def save_game_data(
     num_players: int, 
     recovery_codes: list[str],
     initial_endowment: float = 20.0,
-    public_good_efficiency: float = 0.5
+    public_good_efficiency: float = 0.5,
+    created_at: Optional[datetime] = None,
 ) -> Path:
     """Save game data to a JSON file in the specs/games directory."""
     specs_dir = specs_path.parent / "games"
@@ -38,13 +39,12 @@ def save_game_data(
         "recovery_codes": recovery_codes,
         "initial_endowment": initial_endowment,
         "public_good_efficiency": public_good_efficiency,
-        "created_at": datetime.now().isoformat(),
+        "created_at": (created_at or datetime.now()).isoformat(),
     }
 
     output_file = specs_dir / f"game_{game_id}.json"
     try:
-        with output_file.open("w") as f:
-            json.dump(game_data, f, indent=2)
+        output_file.write_bytes(orjson.dumps(game_data, option=orjson.OPT_INDENT_2))
         logger.info(f"Game data saved to {output_file}")
     except Exception as e:
         logger.error(f"Failed to save game data: {e}")
@@ -60,8 +60,9 @@ def create_game_from_specs(
 ) -> dict:
     """Create a new Public Goods game from specs."""
     try:
-        game_id = int(datetime.now().timestamp())
-        game_name = f"Public Goods Game {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        now = datetime.now()
+        game_id = int(now.timestamp())
+        game_name = f"Public Goods Game {now:%Y-%m-%d %H:%M:%S}"
         recovery_codes = generate_recovery_codes(num_players=num_players)
 
         save_game_data(
@@ -72,6 +73,7 @@ def create_game_from_specs(
             recovery_codes=recovery_codes,
             initial_endowment=initial_endowment,
             public_good_efficiency=public_good_efficiency,
+            created_at=now,
         )
 
         return {
@@ -81,7 +83,7 @@ def create_game_from_specs(
             "recovery_codes": recovery_codes,
             "initial_endowment": initial_endowment,
             "public_good_efficiency": public_good_efficiency,
-            "created_at": datetime.now().isoformat(),
+            "created_at": now.isoformat(),
         }
 
     except Exception as e:
@@ -1,9 +1,11 @@
 import asyncio
-import json
 import logging
+import os
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any, Dict, Optional
 
+import orjson
 import websockets
 from websockets.asyncio.server import serve, ServerConnection
 from dotenv import load_dotenv
@@ -11,7 +13,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 logging.basicConfig(
-    level=logging.INFO,
+    level=os.environ.get("LOG_LEVEL", "INFO").upper(),
     format="%(asctime)s [%(levelname)s] %(message)s",
     handlers=[
         logging.StreamHandler(),
@@ -23,32 +25,45 @@ WAITING = "waiting"
 CONTRIBUTION_PHASE = "contribution"
 PAYOUT_PHASE = "payout"
 FINISHED = "finished"
+PHASE_NAMES = {1: CONTRIBUTION_PHASE, 2: PAYOUT_PHASE}
 
 SPECS_PATH = Path(__file__).parent / "games"
 
 
+def encode_shared_event(event_type: str, data: Dict[str, Any]) -> bytes:
+    """Encode an event whose data is shared by all players, leaving the data open."""
+    return b'{"type":"event","eventType":%s,"data":%s' % (
+        orjson.dumps(event_type),
+        orjson.dumps(data)[:-1],
+    )
+
+
+def finish_event(shared: bytes, fields: Dict[str, Any]) -> bytes:
+    """Complete a shared event with the data fields specific to one player."""
+    return shared + b"," + orjson.dumps(fields)[1:] + b"}"
+
+
+@dataclass(slots=True)
 class PublicGoodsGame:
     """Represents a single Public Goods game."""
 
-    def __init__(
-        self, 
-        game_id: int, 
-        num_players: int = 4,
-        initial_endowment: float = 20.0, 
-        public_good_efficiency: float = 0.5
-    ):
-        self.game_id = game_id
-        self.num_players = num_players
-        self.players: dict[str, Optional[ServerConnection]] = {}
-        self.player_names: dict[str, str] = {}
-        self.player_recovery_codes: dict[str, str] = {}
-        self.state = WAITING
-        self.current_phase = 0
-        self.initial_endowment = initial_endowment
-        self.public_good_efficiency = public_good_efficiency
-        self.contributions: dict[str, float] = {}
-        self.contributions_made: dict[str, bool] = {}
-        self.players_done: dict[str, bool] = {}
+    game_id: int
+    num_players: int = 4
+    initial_endowment: float = 20.0
+    public_good_efficiency: float = 0.5
+    players: dict[str, Optional[ServerConnection]] = field(
+        default_factory=dict, init=False
+    )
+    player_names: dict[str, str] = field(default_factory=dict, init=False)
+    player_recovery_codes: dict[str, str] = field(default_factory=dict, init=False)
+    state: str = field(default=WAITING, init=False)
+    current_phase: int = field(default=0, init=False)
+    contributions: dict[str, float] = field(default_factory=dict, init=False)
+    contributions_made: dict[str, bool] = field(default_factory=dict, init=False)
+    players_done: dict[str, bool] = field(default_factory=dict, init=False)
+    # Number of True entries in contributions_made and players_done
+    contribution_count: int = field(default=0, init=False)
+    done_count: int = field(default=0, init=False)
 
     def add_player(self, player_id: str, websocket: ServerConnection, name: str):
         """Add a player to the game."""
@@ -56,7 +71,7 @@ class PublicGoodsGame:
         self.player_names[player_id] = name
         self.players_done[player_id] = False
         self.contributions_made[player_id] = False
-        logger.info(f"Added {player_id} ({name}) to game {self.game_id}")
+        logger.info("Added %s (%s) to game %s", player_id, name, self.game_id)
 
     def is_ready(self) -> bool:
         """Check if the game is ready to start (has all players)."""
@@ -72,34 +87,40 @@ class PublicGoodsGame:
             )
 
         self.contributions[player_id] = contribution
-        self.contributions_made[player_id] = True
-        logger.info(f"Player {player_id} contributed {contribution} in game {self.game_id}")
+        if not self.contributions_made[player_id]:
+            self.contributions_made[player_id] = True
+            self.contribution_count += 1
+        logger.info(
+            "Player %s contributed %s in game %s", player_id, contribution, self.game_id
+        )
 
     def calculate_payoffs(self) -> Dict[str, float]:
         """Calculate the payoffs for all players."""
-        total_contribution = sum(self.contributions.values())
-        payoffs = {}
-        
-        for player_id in self.players:
-            player_contribution = self.contributions.get(player_id, 0.0)
-            kept = self.initial_endowment - player_contribution
-            share_of_public_good = self.public_good_efficiency * total_contribution
-            payoffs[player_id] = kept + share_of_public_good
-        
-        return payoffs
+        contributions = self.contributions
+        endowment = self.initial_endowment
+        # Every player receives the same share of the public good
+        share_of_public_good = self.public_good_efficiency * sum(contributions.values())
+
+        return {
+            player_id: endowment - contributions.get(player_id, 0.0)
+            + share_of_public_good
+            for player_id in self.players
+        }
 
     def mark_player_done(self, player_id: str) -> None:
         """Mark a player as done with the current phase."""
-        self.players_done[player_id] = True
-        logger.info(f"Player {player_id} marked as done in game {self.game_id}")
+        if not self.players_done[player_id]:
+            self.players_done[player_id] = True
+            self.done_count += 1
+        logger.info("Player %s marked as done in game %s", player_id, self.game_id)
 
     def all_players_done(self) -> bool:
         """Check if all players are done with the current phase."""
-        return all(self.players_done.values())
+        return self.done_count == len(self.players_done)
     
     def all_contributions_made(self) -> bool:
         """Check if all players have made their contributions."""
-        return all(self.contributions_made.values())
+        return self.contribution_count == len(self.contributions_made)
 
 
 class PublicGoodsServer:
@@ -109,17 +130,23 @@ class PublicGoodsServer:
         self.host = host
         self.port = port
         self.games: Dict[int, PublicGoodsGame] = {}
+        # Game specs never change once created, so each file is read only once
+        self.game_specs: Dict[int, Dict[str, Any]] = {}
+        # Encoded messages waiting to be sent, one queue per connection
+        self.outboxes: Dict[ServerConnection, asyncio.Queue] = {}
 
     async def handle_websocket(self, websocket: ServerConnection) -> None:
         """Handle WebSocket connections."""
         game = None
         player_id = None
+        outbox = self.outboxes[websocket] = asyncio.Queue()
+        writer = asyncio.create_task(self.write_messages(websocket, outbox))
 
         try:
             async for message in websocket:
                 try:
-                    data = json.loads(message)
-                    logger.debug(f"Message: {data}")
+                    data = orjson.loads(message)
+                    logger.debug("Message: %s", data)
                     msg_type = data.get("type", "")
 
                     if msg_type == "join":
@@ -132,18 +159,16 @@ class PublicGoodsServer:
                             )
                             continue
 
-                        game_specs_path = SPECS_PATH / f"game_{game_id}.json"
+                        game_specs = self.load_game_specs(game_id)
 
-                        if not game_specs_path.exists():
+                        if game_specs is None:
                             await self.send_error(
                                 websocket, f"Game {game_id} does not exist"
                             )
                             continue
 
-                        with game_specs_path.open("r") as f:
-                            game_specs = json.load(f)
-
-                        if recovery not in game_specs["recovery_codes"]:
+                        recovery_index = game_specs["recovery_index"].get(recovery)
+                        if recovery_index is None:
                             await self.send_error(
                                 websocket, f"Invalid recovery code: {recovery}"
                             )
@@ -164,7 +189,6 @@ class PublicGoodsServer:
                             await self.send_error(websocket, f"Game {game_id} is full")
                             continue
 
-                        recovery_index = game_specs["recovery_codes"].index(recovery)
                         player_id = f"player_{recovery_index + 1}"
 
                         if player_id in game.players:
@@ -230,31 +254,46 @@ class PublicGoodsServer:
                             websocket, f"Unknown message type: {msg_type}"
                         )
 
-                except json.JSONDecodeError:
+                except orjson.JSONDecodeError:
                     await self.send_error(websocket, "Invalid JSON message")
                 except Exception as e:
-                    logger.exception(f"Error handling message: {e}")
+                    logger.exception("Error handling message: %s", e)
                     await self.send_error(websocket, f"Error: {str(e)}")
 
         except websockets.exceptions.ConnectionClosed:
-            logger.info(f"Connection closed for {player_id}")
+            logger.info("Connection closed for %s", player_id)
         finally:
+            writer.cancel()
+            self.outboxes.pop(websocket, None)
             if game and player_id is not None:
                 if player_id in game.players:
                     game.players[player_id] = None
-                logger.info(f"{player_id} disconnected from game {game.game_id}")
+                logger.info("%s disconnected from game %s", player_id, game.game_id)
+
+    def load_game_specs(self, game_id: int) -> Optional[Dict[str, Any]]:
+        """Load the specs of a game, reading its file on first use only."""
+        game_specs = self.game_specs.get(game_id)
+        if game_specs is None:
+            game_specs_path = SPECS_PATH / f"game_{game_id}.json"
+            if not game_specs_path.is_file():
+                return None
+            game_specs = orjson.loads(game_specs_path.read_bytes())
+            # Player index by recovery code, so joins need no list scan
+            game_specs["recovery_index"] = {
+                code: i for i, code in enumerate(game_specs["recovery_codes"])
+            }
+            self.game_specs[game_id] = game_specs
+        return game_specs
 
     async def start_game(self, game: PublicGoodsGame) -> None:
         """Start a new game."""
         game.state = CONTRIBUTION_PHASE
         game.current_phase = 1
 
-        for player_id, websocket in game.players.items():
-            if websocket:
-                await self.send_game_started(websocket, game, player_id)
+        await self.send_game_started(game)
 
         logger.info(
-            f"Game {game.game_id} started with players {list(game.players.keys())}"
+            "Game %s started with players %s", game.game_id, list(game.players.keys())
         )
 
     async def process_contribution_completion(self, game: PublicGoodsGame) -> None:
@@ -265,27 +304,46 @@ class PublicGoodsServer:
         # Reset players_done for phase 2
         for player_id in game.players_done:
             game.players_done[player_id] = False
+        game.done_count = 0
 
         payoffs = game.calculate_payoffs()
         total_contribution = sum(game.contributions.values())
 
         # Send contribution results first to update state
-        for player_id, websocket in game.players.items():
-            if websocket:
-                await self.send_contribution_result(
-                    websocket, game, player_id, payoffs, total_contribution
-                )
+        await self.send_contribution_result(game, payoffs, total_contribution)
 
         # Then send phase-started event for phase 2
-        for player_id, websocket in game.players.items():
-            if websocket:
-                await self.send_phase_started(websocket, game, player_id)
+        await self.send_phase_started(game)
+
+    async def write_messages(
+        self, websocket: ServerConnection, outbox: asyncio.Queue
+    ) -> None:
+        """Send a client's queued messages in order."""
+        try:
+            while True:
+                message = await outbox.get()
+                await websocket.send(message)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        except Exception:
+            logger.exception("Failed to send message, closing connection")
+            await websocket.close(1011, "Internal error")
+        finally:
+            # Nothing drains this outbox any more, so stop queueing messages to it
+            if self.outboxes.get(websocket) is outbox:
+                del self.outboxes[websocket]
+
+    async def send_encoded(self, websocket: ServerConnection, payload: bytes) -> None:
+        """Queue an already encoded message for a client."""
+        outbox = self.outboxes.get(websocket)
+        if outbox is not None:
+            outbox.put_nowait(payload)
 
     async def send_message(
         self, websocket: ServerConnection, message: Dict[str, Any]
     ) -> None:
-        """Send a message to a client."""
-        await websocket.send(json.dumps(message))
+        """Queue a message for a client."""
+        await self.send_encoded(websocket, orjson.dumps(message))
 
     async def send_error(self, websocket: ServerConnection, error_message: str) -> None:
         """Send an error message to a client."""
@@ -313,122 +371,126 @@ class PublicGoodsServer:
             },
         )
 
-    async def send_game_started(
-        self, websocket: ServerConnection, game: PublicGoodsGame, player_id: str
-    ) -> None:
-        """Send a game-started message to a player."""
-        await self.send_message(
-            websocket,
+    def encode_phase_started(self, game: PublicGoodsGame) -> bytes:
+        """Encode the part of a phase-started message shared by all players."""
+        return encode_shared_event(
+            "phase-started",
             {
-                "type": "event",
-                "eventType": "game-started",
-                "data": {
-                    "game_id": game.game_id,
-                    "player_id": player_id,
-                    "num_players": game.num_players,
-                    "initial_endowment": game.initial_endowment,
-                    "public_good_efficiency": game.public_good_efficiency,
-                },
+                "gameId": game.game_id,
+                "phase": game.current_phase,
+                "phase_name": PHASE_NAMES[game.current_phase],
+                "initial_endowment": game.initial_endowment,
+                "public_good_efficiency": game.public_good_efficiency,
+                "num_players": game.num_players,
             },
         )
 
-        await self.send_phase_started(websocket, game, player_id)
-
-    async def send_phase_started(
-        self, websocket: ServerConnection, game: PublicGoodsGame, player_id: str
-    ) -> None:
-        """Send a phase-started message to a player."""
-        await self.send_message(
-            websocket,
+    async def send_game_started(self, game: PublicGoodsGame) -> None:
+        """Send game-started and phase-started messages to all players."""
+        game_started = encode_shared_event(
+            "game-started",
             {
-                "type": "event",
-                "eventType": "phase-started",
-                "data": {
-                    "gameId": game.game_id,
-                    "phase": game.current_phase,
-                    "phase_name": "contribution" if game.current_phase == 1 else "payout",
-                    "player_id": player_id,
-                    "initial_endowment": game.initial_endowment,
-                    "public_good_efficiency": game.public_good_efficiency,
-                    "num_players": game.num_players,
-                },
+                "game_id": game.game_id,
+                "num_players": game.num_players,
+                "initial_endowment": game.initial_endowment,
+                "public_good_efficiency": game.public_good_efficiency,
             },
         )
+        phase_started = self.encode_phase_started(game)
+
+        for player_id, websocket in game.players.items():
+            if websocket:
+                await self.send_encoded(
+                    websocket, finish_event(game_started, {"player_id": player_id})
+                )
+                await self.send_encoded(
+                    websocket, finish_event(phase_started, {"player_id": player_id})
+                )
+
+    async def send_phase_started(self, game: PublicGoodsGame) -> None:
+        """Send a phase-started message to all players."""
+        phase_started = self.encode_phase_started(game)
+
+        for player_id, websocket in game.players.items():
+            if websocket:
+                await self.send_encoded(
+                    websocket, finish_event(phase_started, {"player_id": player_id})
+                )
 
     async def send_contribution_result(
         self,
-        websocket: ServerConnection,
         game: PublicGoodsGame,
-        player_id: str,
         payoffs: Dict[str, float],
         total_contribution: float,
     ) -> None:
-        """Send a contribution-result message to a player."""
+        """Send a contribution-result message to all players."""
         # Ensure all players are in contributions dict (with 0 for those who didn't contribute)
         all_contributions = {pid: game.contributions.get(pid, 0.0) for pid in game.players}
-        
-        await self.send_message(
-            websocket,
+        contribution_result = encode_shared_event(
+            "contribution-result",
             {
-                "type": "event",
-                "eventType": "contribution-result",
-                "data": {
-                    "gameId": game.game_id,
-                    "player_id": player_id,
-                    "contributions": all_contributions,
-                    "total_contribution": total_contribution,
-                    "initial_endowment": game.initial_endowment,
-                    "public_good_efficiency": game.public_good_efficiency,
-                    "payoffs": payoffs,
-                    "your_payoff": payoffs[player_id],
-                },
+                "gameId": game.game_id,
+                "contributions": all_contributions,
+                "total_contribution": total_contribution,
+                "initial_endowment": game.initial_endowment,
+                "public_good_efficiency": game.public_good_efficiency,
+                "payoffs": payoffs,
             },
         )
 
+        for player_id, websocket in game.players.items():
+            if websocket:
+                await self.send_encoded(
+                    websocket,
+                    finish_event(
+                        contribution_result,
+                        {"player_id": player_id, "your_payoff": payoffs[player_id]},
+                    ),
+                )
+
     async def send_game_ended(
-        self,
-        websocket: ServerConnection,
-        game: PublicGoodsGame,
-        player_id: str,
-        payoffs: Dict[str, float],
+        self, game: PublicGoodsGame, payoffs: Dict[str, float]
     ) -> None:
-        """Send a game-ended message to a player."""
+        """Send a game-ended message to all players."""
         # Ensure all players are in contributions dict (with 0 for those who didn't contribute)
         all_contributions = {pid: game.contributions.get(pid, 0.0) for pid in game.players}
-        
-        await self.send_message(
-            websocket,
+        game_ended = encode_shared_event(
+            "game-over",
             {
-                "type": "event",
-                "eventType": "game-over",
-                "data": {
-                    "gameId": game.game_id,
-                    "player_id": player_id,
-                    "contributions": all_contributions,
-                    "total_contribution": sum(game.contributions.values()),
-                    "initial_endowment": game.initial_endowment,
-                    "public_good_efficiency": game.public_good_efficiency,
-                    "final_payoff": payoffs[player_id],
-                },
+                "gameId": game.game_id,
+                "contributions": all_contributions,
+                "total_contribution": sum(game.contributions.values()),
+                "initial_endowment": game.initial_endowment,
+                "public_good_efficiency": game.public_good_efficiency,
             },
         )
 
+        for player_id, websocket in game.players.items():
+            if websocket:
+                await self.send_encoded(
+                    websocket,
+                    finish_event(
+                        game_ended,
+                        {"player_id": player_id, "final_payoff": payoffs[player_id]},
+                    ),
+                )
+
     async def end_game(self, game: PublicGoodsGame) -> None:
         """End the game after all players are done with phase 2."""
         game.state = FINISHED
         payoffs = game.calculate_payoffs()
 
-        for player_id, websocket in game.players.items():
-            if websocket:
-                await self.send_game_ended(websocket, game, player_id, payoffs)
+        await self.send_game_ended(game, payoffs)
 
-        logger.info(f"Game {game.game_id} ended with payoffs: {payoffs}")
+        logger.info("Game %s ended with payoffs: %s", game.game_id, payoffs)
 
     async def start_server(self) -> None:
         """Start the WebSocket server."""
         async with serve(self.handle_websocket, self.host, self.port):
             logger.info(
-                f"Public Goods game WebSocket server started on {self.host}:{self.port}"
+                "Public Goods game WebSocket server started on %s:%s",
+                self.host,
+                self.port,
             )
             await asyncio.Future()
 
@@ -443,6 +505,11 @@ if __name__ == "__main__":
     host = "localhost"
     port = 8765
 
-    logger.info(f"Starting Public Goods game WebSocket server on {host}:{port}")
+    logger.info("Starting Public Goods game WebSocket server on %s:%s", host, port)
 
-    asyncio.run(PublicGoodsServer.run(host, port))
+    try:
+        import uvloop
+    except ImportError:  # uvloop is not available on Windows
+        asyncio.run(PublicGoodsServer.run(host, port))
+    else:
+        uvloop.run(PublicGoodsServer.run(host, port))
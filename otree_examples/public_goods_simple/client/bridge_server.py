@@ -1,20 +1,101 @@
 import asyncio
-import json
 import logging
-from typing import Dict, List, Optional, Set
-
-from bs4 import BeautifulSoup
-import requests
+import os
+from dataclasses import dataclass, field
+from operator import itemgetter
+from typing import Dict, Optional, Tuple, Union
+from urllib.parse import urljoin
+
+import aiohttp
+from lxml import etree
+import orjson
 import websockets
 from websockets.asyncio.server import serve, ServerConnection
+from yarl import URL
 
 
-# Configure logging
+# Configure logging, set LOG_LEVEL=WARNING to silence per-page messages
 logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+    level=os.environ.get("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
 )
 logger = logging.getLogger("bridge_server")
 
+# Queries run on every oTree page, compiled once
+OTREE_DATA_XPATH = etree.XPath('string(//script[@id="otree-data"])')
+FORM_FIELDS_XPATH = etree.XPath(
+    '//*[contains(concat(" ", normalize-space(@class), " "), " _formfield ")]'
+    "//input/@name"
+)
+
+# Identifiers carried by every task message
+TASK_IDS = itemgetter("participant_code", "participant_id")
+
+# The game-over event is the same for every participant, so it is encoded once
+GAME_OVER_MESSAGE = orjson.dumps(
+    {
+        "type": "event",
+        "eventType": "game-over",
+        "data": {"message": "Experiment completed"},
+    }
+)
+
+
+def event_prefix(event_type: str) -> bytes:
+    """Encode the fixed head of an event envelope, up to where its data starts."""
+    return b'{"type":"event","eventType":%s,"data":' % orjson.dumps(event_type)
+
+
+# Envelope heads for events whose data changes from message to message
+PHASE_TRANSITION_PREFIX = event_prefix("phase-transition")
+ROUND_STARTED_PREFIX = event_prefix("round-started")
+ROUND_RESULT_PREFIX = event_prefix("round-result")
+
+
+# Redirects are followed by hand, so every hop's cookies reach the participant's jar
+MAX_REDIRECTS = 10
+
+# Events with larger data are sent as fragments instead of one joined buffer
+FRAGMENT_THRESHOLD = 16 * 1024
+
+
+def encode_event(
+    prefix: bytes, data: dict
+) -> Union[bytes, Tuple[bytes, bytes, bytes]]:
+    """Encode an event by splicing its data into a pre-encoded envelope."""
+    body = orjson.dumps(data)
+    if len(body) > FRAGMENT_THRESHOLD:
+        return prefix, body, b"}"
+    return prefix + body + b"}"
+
+
+def parse_otree_page(tree: etree._Element) -> Tuple[Tuple[str, ...], str]:
+    """Extract the form field names and the otree-data JSON text from an oTree page."""
+    form_fields = tuple(str(name) for name in FORM_FIELDS_XPATH(tree) if name)
+    return form_fields, str(OTREE_DATA_XPATH(tree))
+
+
+def is_redirect(response: aiohttp.ClientResponse) -> bool:
+    """Check whether an oTree response redirects to another page."""
+    return (
+        response.status in (301, 302, 303, 307, 308)
+        and "Location" in response.headers
+    )
+
+
+@dataclass(slots=True)
+class Participant:
+    """Connection and navigation state of a participant handled by the bridge."""
+
+    websocket: ServerConnection
+    cookie_jar: aiohttp.CookieJar
+    url: str = ""
+    phase: int = 0  # Current phase number
+    form_fields: Tuple[str, ...] = ()
+    # Encoded messages waiting to be sent by the writer task, None stops the writer
+    outbox: asyncio.Queue = field(default_factory=asyncio.Queue)
+    writer: Optional[asyncio.Task] = None
+
 
 class OTreeBridge:
     """Bridge server that connects econagents WebSocket clients to oTree HTTP API."""
@@ -22,17 +103,92 @@ class OTreeBridge:
     def __init__(
         self,
         otree_url: str = "http://localhost:8000",
+        max_connections: int = 64,
     ):
         self.otree_url = otree_url
-        self.sessions: Dict[str, Dict] = {}
-        self.participant_connections: Dict[str, ServerConnection] = {}
-        self.participant_sessions: Dict[str, requests.Session] = {}
-        self.participant_urls: Dict[str, str] = {}
-        self.session_participants: Dict[str, Set[str]] = {}
-        self.form_fields: Dict[str, List[str]] = {}
-        self.participant_phases: Dict[
-            str, int
-        ] = {}  # Track current phase number per participant
+        self.max_connections = max_connections
+        # Base that relative redirect locations are resolved against
+        self.otree_base = otree_url.rstrip("/") + "/"
+        self.participants: Dict[str, Participant] = {}
+        self.http: Optional[aiohttp.ClientSession] = None
+        self.message_handlers = {"join": self.handle_join}
+
+    async def start(self):
+        """Open the HTTP session shared by all participants."""
+        # Cookies are tracked per participant, so the shared session must not keep any
+        self.http = aiohttp.ClientSession(
+            headers={"User-Agent": "oTree econagents bridge"},
+            # Requests beyond the limit wait for a free connection, so a burst of
+            # participants cannot overload oTree's workers
+            connector=aiohttp.TCPConnector(
+                limit=self.max_connections, keepalive_timeout=60
+            ),
+            cookie_jar=aiohttp.DummyCookieJar(),
+            # 4xx/5xx responses raise ClientResponseError before the body is read
+            raise_for_status=True,
+        )
+
+    async def close(self):
+        """Close the shared HTTP session."""
+        if self.http:
+            await self.http.close()
+            self.http = None
+
+    async def http_request(
+        self,
+        participant: Participant,
+        method: str,
+        url: str,
+        timeout: float = 10,
+        **kwargs,
+    ) -> aiohttp.ClientResponse:
+        """Send a request to oTree with the participant's cookies and read the body."""
+        jar = participant.cookie_jar
+        async with self.http.request(
+            method,
+            url,
+            cookies=jar.filter_cookies(URL(url)),
+            timeout=aiohttp.ClientTimeout(total=timeout),
+            **kwargs,
+        ) as response:
+            await response.read()
+        jar.update_cookies(response.cookies, response.url)
+        return response
+
+    async def fetch_otree_page(
+        self, participant: Participant, url: str
+    ) -> Tuple[Tuple[str, ...], str]:
+        """Fetch an oTree page, parsing the body as it arrives, and return its data.
+
+        Redirects are followed with the participant's cookies, and the URL of the
+        page finally shown is stored as the participant's current URL.
+        """
+        jar = participant.cookie_jar
+        for _ in range(MAX_REDIRECTS + 1):
+            async with self.http.get(
+                url,
+                cookies=jar.filter_cookies(URL(url)),
+                timeout=aiohttp.ClientTimeout(total=10),
+                allow_redirects=False,
+            ) as response:
+                jar.update_cookies(response.cookies, response.url)
+                if is_redirect(response):
+                    await response.read()
+                    url = urljoin(self.otree_base, response.headers["Location"])
+                    continue
+
+                parser = etree.HTMLParser(encoding=response.charset or "utf-8")
+                async for chunk in response.content.iter_chunked(8192):
+                    parser.feed(chunk)
+            participant.url = url
+            try:
+                tree = parser.close()
+            except etree.XMLSyntaxError:
+                # An empty body carries no page data, like a page without otree-data
+                return (), ""
+            return parse_otree_page(tree)
+
+        raise Exception(f"Too many redirects while fetching {url}")
 
     async def handle_websocket(self, websocket: ServerConnection):
         """Handle incoming WebSocket connections from econagents clients."""
@@ -41,18 +197,20 @@ class OTreeBridge:
             logger.info("New WebSocket connection established")
             async for message in websocket:
                 try:
-                    data = json.loads(message)
-                    logger.debug(f"Received message: {data}")
+                    data = orjson.loads(message)
+                    logger.debug("Received message: %s", data)
                     participant_code = await self.process_message(websocket, data)
-                except json.JSONDecodeError:
+                except orjson.JSONDecodeError:
                     logger.error("Invalid JSON received")
-                    await self.send_error(websocket, "Invalid JSON")
+                    await self.send_error(websocket, "Invalid JSON", participant_code)
                 except Exception as e:
-                    logger.exception(f"Error processing message: {e}")
-                    await self.send_error(websocket, f"Error: {str(e)}")
+                    logger.exception("Error processing message: %s", e)
+                    await self.send_error(
+                        websocket, f"Error: {str(e)}", participant_code
+                    )
         except websockets.exceptions.ConnectionClosed:
             logger.info(
-                f"WebSocket connection closed for participant {participant_code}"
+                "WebSocket connection closed for participant %s", participant_code
             )
         finally:
             await self.cleanup_connection(websocket, participant_code)
@@ -61,16 +219,13 @@ class OTreeBridge:
         self, websocket: ServerConnection, data: dict
     ) -> Optional[str]:
         """Process messages from econagents clients."""
-        msg_type = data.get("type")
-        participant_code = None
-
-        if msg_type == "join":
-            participant_code = await self.handle_join(websocket, data)
-        else:
-            participant_code = data.get("participant_code")
-            await self.handle_task(websocket, data)
+        handler = self.message_handlers.get(data.get("type"))
+        if handler:
+            return await handler(websocket, data)
 
-        return participant_code
+        # Any other message is a task submission
+        await self.handle_task(websocket, data)
+        return data.get("participant_code")
 
     async def handle_join(self, websocket: ServerConnection, data: dict) -> str:
         """Handle participant joining using the participant_code provided by the client."""
@@ -85,48 +240,57 @@ class OTreeBridge:
 
         try:
             logger.info(
-                f"Handling join for participant_code: {participant_code}, participant_id: {participant_id}"
+                "Handling join for participant_code: %s, participant_id: %s",
+                participant_code,
+                participant_id,
             )
 
-            self.participant_connections[participant_code] = websocket
-
-            http_session = requests.Session()
-            http_session.headers.update({"User-Agent": "oTree econagents bridge"})
-            self.participant_sessions[participant_code] = http_session
+            # A rejoin replaces the previous state, whose writer flushes and exits
+            previous = self.participants.get(participant_code)
+            if previous:
+                previous.outbox.put_nowait(None)
 
-            # Initialize phase counter
-            self.participant_phases[participant_code] = 0
+            # aiohttp drops cookies from IP-address hosts unless the jar is unsafe
+            participant = Participant(
+                websocket=websocket, cookie_jar=aiohttp.CookieJar(unsafe=True)
+            )
+            participant.writer = asyncio.create_task(
+                self.write_messages(participant_code, participant)
+            )
+            self.participants[participant_code] = participant
 
             await self.initialize_participant(participant_code, participant_id)
 
             logger.info(
-                f"Participant {participant_id} (code: {participant_code}) successfully joined and initialized."
+                "Participant %s (code: %s) successfully joined and initialized.",
+                participant_id,
+                participant_code,
             )
             return participant_code
 
         except Exception as e:
             logger.exception(
-                f"Error in handle_join for participant_code {participant_code}: {e}"
+                "Error in handle_join for participant_code %s: %s", participant_code, e
+            )
+            await self.send_error(
+                websocket, f"Error during join process: {str(e)}", participant_code
             )
-            await self.send_error(websocket, f"Error during join process: {str(e)}")
-            if participant_code in self.participant_connections:
-                del self.participant_connections[participant_code]
-            if participant_code in self.participant_sessions:
-                del self.participant_sessions[participant_code]
+            await self.cleanup_connection(websocket, participant_code)
             return ""
 
     async def handle_task(self, websocket: ServerConnection, data: dict):
         """Handle task submission to oTree."""
-        participant_code = data["participant_code"]
-        participant_id = data["participant_id"]
-        task_data = {}
-        for f in self.form_fields.get(participant_code, []):
-            task_data[f] = data.get(f)
+        participant_code, participant_id = TASK_IDS(data)
+        participant = self.participants.get(participant_code)
+        form_fields = participant.form_fields if participant else ()
+        task_data = {f: data.get(f) for f in form_fields}
 
         if not all(
             [participant_code, participant_id is not None, task_data is not None]
         ):
-            await self.send_error(websocket, "Missing required fields for task")
+            await self.send_error(
+                websocket, "Missing required fields for task", participant_code
+            )
             return
 
         try:
@@ -137,7 +301,7 @@ class OTreeBridge:
 
             if success:
                 logger.info(
-                    f"Task {task_data} submitted for participant {participant_code}"
+                    "Task %s submitted for participant %s", task_data, participant_code
                 )
                 # Continue navigating through pages
                 await self.navigate_experiment(
@@ -145,283 +309,247 @@ class OTreeBridge:
                     participant_id,  # type: ignore
                 )
             else:
-                await self.send_error(websocket, "Failed to submit task")
+                await self.send_error(websocket, "Failed to submit task", participant_code)
 
         except Exception as e:
-            logger.exception(f"Error handling task: {e}")
-            await self.send_error(websocket, f"Error submitting task: {str(e)}")
-
-    def get_participant_configs(self, session_code: str) -> list:
-        """Get participant configurations for econagents from the most recent or specified session."""
-        session_info = self.sessions[session_code]
-        return [
-            {
-                "participant_code": p["code"],
-                "participant_id": p["id_in_session"],
-            }
-            for p in session_info["participants_info"]
-        ]
+            logger.exception("Error handling task: %s", e)
+            await self.send_error(
+                websocket, f"Error submitting task: {str(e)}", participant_code
+            )
 
     async def continue_to_next_page(
         self,
-        http_session: requests.Session,
         participant_code: str,
         participant_id: int,
         url: str,
     ):
         """Continue to the next page for the participant."""
-        response = await asyncio.to_thread(
-            http_session.get, url, allow_redirects=False, timeout=10
+        participant = self.participants[participant_code]
+        response = await self.http_request(
+            participant, "GET", url, allow_redirects=False
         )
-        response.raise_for_status()
-
-        if not response.is_redirect:
-            raise Exception(f"Expected redirect from {url}, got {response.status_code}")
 
-        task_url = response.headers["Location"]
+        if not is_redirect(response):
+            raise Exception(f"Expected redirect from {url}, got {response.status}")
 
-        if not task_url.startswith("http"):
-            task_url = f"{self.otree_url}{task_url}"
+        task_url = urljoin(self.otree_base, response.headers["Location"])
 
-        logger.info(f"Participant {participant_code} redirected to page: {task_url}")
-        response_task = await asyncio.to_thread(
-            http_session.get, task_url, allow_redirects=False, timeout=10
+        logger.info("Participant %s redirected to page: %s", participant_code, task_url)
+        participant.form_fields, otree_data = await self.fetch_otree_page(
+            participant, task_url
         )
-        response_task.raise_for_status()
-
-        self.participant_urls[participant_code] = task_url
-
-        # Clear previous form fields
-        self.form_fields[participant_code] = []
-
-        soup = BeautifulSoup(response_task.text, "html.parser")
-        otree_data = soup.find("script", id="otree-data")
-
-        # Extract form fields
-        for field in soup.select("._formfield input"):
-            field_name = field.get("name")
-            if field_name:
-                self.form_fields[participant_code].append(str(field_name))
 
         # If there are form fields, this is an action page
-        if self.form_fields[participant_code] and otree_data:
+        if participant.form_fields and otree_data:
             # Increment phase number
-            self.participant_phases[participant_code] += 1
-            phase_number = self.participant_phases[participant_code]
+            participant.phase += 1
 
-            state_data = json.loads(otree_data.text)
-            state_data["phase"] = phase_number
-            state_data["required_fields"] = self.form_fields[participant_code]
+            state_data = orjson.loads(otree_data)
+            state_data["phase"] = participant.phase
+            state_data["required_fields"] = participant.form_fields
             await self.send_phase_update(participant_code, participant_id, state_data)
 
     async def initialize_participant(self, participant_code: str, participant_id: int):
         """Initialize participant in oTree and navigate to the contribution page."""
-        http_session = self.participant_sessions.get(participant_code)
-        if not http_session:
+        if participant_code not in self.participants:
             logger.error(
-                f"HTTP session not found for participant {participant_code} in initialize_participant."
-            )
-            raise ValueError(
-                f"HTTP Session not found for participant {participant_code}"
+                "Participant %s not found in initialize_participant.",
+                participant_code,
             )
+            raise ValueError(f"Participant {participant_code} not found")
 
         try:
             init_url = f"{self.otree_url}/InitializeParticipant/{participant_code}"
-            logger.info(f"Initializing participant {participant_code} at {init_url}")
+            logger.info("Initializing participant %s at %s", participant_code, init_url)
             await self.continue_to_next_page(
-                http_session,
                 participant_code,
                 participant_id,
                 init_url,
             )
         except Exception as e:
-            logger.exception(f"Error initializing participant {participant_code}: {e}")
+            logger.exception(
+                "Error initializing participant %s: %s", participant_code, e
+            )
             raise
 
     async def submit_task_to_otree(
         self, participant_code: str, task_data: dict
     ) -> bool:
         """Submit contribution to oTree for the participant."""
-        http_session = self.participant_sessions[participant_code]
-        contrib_url = self.participant_urls.get(participant_code)
+        participant = self.participants.get(participant_code)
 
-        if not contrib_url:
+        if not participant or not participant.url:
             logger.error(
-                f"HTTP session not found for participant {participant_code} in submit_contribution_to_otree."
+                "Participant %s not found or without a page in submit_task_to_otree.",
+                participant_code,
             )
             return False
 
         try:
             logger.info(
-                f"Submitting task {task_data} for participant {participant_code}"
+                "Submitting task %s for participant %s", task_data, participant_code
             )
 
-            response = await asyncio.to_thread(
-                http_session.post,
-                contrib_url,
-                data=task_data,
+            # Drop unset fields, as the form encoder would send them as "None"
+            form_data = {k: v for k, v in task_data.items() if v is not None}
+            response = await self.http_request(
+                participant,
+                "POST",
+                participant.url,
+                data=form_data,
                 allow_redirects=False,
-                timeout=10,
             )
-            response.raise_for_status()
 
-            if not response.is_redirect:
+            if not is_redirect(response):
                 logger.error(
-                    f"Expected redirect after contribution submission, got {response.status_code}"
+                    "Expected redirect after contribution submission, got %s",
+                    response.status,
                 )
                 return False
 
-            wait_url = response.headers["Location"]
-            if not wait_url.startswith("http"):
-                wait_url = f"{self.otree_url}{wait_url}"
+            wait_url = urljoin(self.otree_base, response.headers["Location"])
 
             logger.info(
-                f"Participant {participant_code} redirected to wait page: {wait_url}"
+                "Participant %s redirected to wait page: %s", participant_code, wait_url
             )
-            self.participant_urls[participant_code] = wait_url
+            participant.url = wait_url
 
             return True
 
         except Exception as e:
             logger.exception(
-                f"Error submitting contribution for {participant_code}: {e}"
+                "Error submitting contribution for %s: %s", participant_code, e
             )
             return False
 
     async def navigate_experiment(self, participant_code: str, participant_id: int):
         """Navigate through experiment pages, handling both wait pages and action pages."""
-        http_session = self.participant_sessions.get(participant_code)
-        if not http_session:
+        participant = self.participants.get(participant_code)
+        if not participant:
             logger.error(
-                f"HTTP session not found for participant {participant_code} in navigate_experiment."
+                "Participant %s not found in navigate_experiment.",
+                participant_code,
             )
             return
 
-        current_url = self.participant_urls.get(participant_code)
+        current_url = participant.url
         if not current_url:
-            logger.error(f"No current URL found for participant {participant_code}")
+            logger.error("No current URL found for participant %s", participant_code)
             return
 
         try:
-            max_attempts = 30  # Increased for potentially longer experiments
-            for attempt in range(max_attempts):
-                logger.info(
-                    f"Checking page for participant {participant_code} (attempt {attempt + 1})"
+            # Wait pages are polled with exponential backoff, starting at 0.1s and
+            # capped at 2s, until the navigation deadline passes
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + 60
+            wait_delay = 0.1
+            etag = None
+            attempt = 0
+            while loop.time() < deadline:
+                attempt += 1
+                logger.debug(
+                    "Checking page for participant %s (attempt %s)",
+                    participant_code,
+                    attempt,
                 )
 
-                response = await asyncio.to_thread(
-                    http_session.get, current_url, allow_redirects=False, timeout=30
+                # Revalidate unchanged wait pages instead of downloading them again
+                response = await self.http_request(
+                    participant,
+                    "GET",
+                    current_url,
+                    timeout=30,
+                    allow_redirects=False,
+                    headers={"If-None-Match": etag} if etag else None,
                 )
-                response.raise_for_status()
 
                 # Handle redirects
-                if response.is_redirect:
-                    next_url = response.headers["Location"]
-                    if not next_url.startswith("http"):
-                        next_url = f"{self.otree_url}{next_url}"
+                if is_redirect(response):
+                    next_url = urljoin(self.otree_base, response.headers["Location"])
 
                     logger.info(
-                        f"Participant {participant_code} redirected to: {next_url}"
+                        "Participant %s redirected to: %s", participant_code, next_url
                     )
 
-                    # Get the next page
-                    next_response = await asyncio.to_thread(
-                        http_session.get, next_url, timeout=10
+                    # Get the next page and check for form fields
+                    participant.form_fields, otree_data = await self.fetch_otree_page(
+                        participant, next_url
                     )
-                    next_response.raise_for_status()
+                    next_url = participant.url
 
-                    self.participant_urls[participant_code] = next_url
-
-                    # Parse the page
-                    soup = BeautifulSoup(next_response.text, "html.parser")
-                    otree_data = soup.find("script", id="otree-data")
-
-                    # Check for form fields
-                    self.form_fields[participant_code] = []
-                    for field in soup.select("._formfield input"):
-                        field_name = field.get("name")
-                        if field_name:
-                            self.form_fields[participant_code].append(str(field_name))
+                    # Pages without otree-data carry nothing to act on or report
+                    if not otree_data:
+                        logger.warning(
+                            "No otree-data found on %s for participant %s",
+                            next_url,
+                            participant_code,
+                        )
+                        return
 
                     # If there are form fields, this is an action page
-                    if self.form_fields[participant_code] and otree_data:
+                    if participant.form_fields:
                         # Increment phase number
-                        self.participant_phases[participant_code] += 1
-                        phase_number = self.participant_phases[participant_code]
-
-                        state_data = json.loads(otree_data.text)
-                        state_data["phase"] = phase_number
-                        state_data["required_fields"] = self.form_fields[
-                            participant_code
-                        ]
+                        participant.phase += 1
+
+                        state_data = orjson.loads(otree_data)
+                        state_data["phase"] = participant.phase
+                        state_data["required_fields"] = participant.form_fields
                         await self.send_phase_update(
                             participant_code, participant_id, state_data
                         )
                         return  # Exit and wait for next action from econagents
 
                     # If no form fields but has state data, might be results or info page
-                    elif otree_data:
-                        state_data = json.loads(otree_data.text)
-                        logger.info(f"Page data: {state_data}")
+                    else:
+                        state_data = orjson.loads(otree_data)
+                        logger.info("Page data: %s", state_data)
 
                         # For results pages, send results event
                         await self.send_results(
                             participant_code, participant_id, state_data
                         )
 
-                        # Try to continue by posting empty form
-                        continue_response = await asyncio.to_thread(
-                            http_session.post,
+                        # Continue past the results page; the writer task sends the
+                        # results event while this request is in flight
+                        continue_response = await self.http_request(
+                            participant,
+                            "POST",
                             next_url,
                             data={},
                             allow_redirects=False,
-                            timeout=10,
                         )
 
-                        if continue_response.is_redirect:
+                        if is_redirect(continue_response):
                             redirect_url = continue_response.headers.get("Location")
                             if redirect_url:
-                                if not redirect_url.startswith("http"):
-                                    redirect_url = f"{self.otree_url}{redirect_url}"
+                                redirect_url = urljoin(self.otree_base, redirect_url)
                                 
                                 # Check if experiment is complete
                                 if "OutOfRangeNotification" in redirect_url:
                                     logger.info(
-                                        f"Participant {participant_code} completed experiment"
+                                        "Participant %s completed experiment",
+                                        participant_code,
                                     )
                                     await self.send_game_completion(participant_code)
                                     return
 
-                                # Fetch and parse the redirected page
-                                redirect_response = await asyncio.to_thread(
-                                    http_session.get, redirect_url, timeout=10
-                                )
-                                redirect_response.raise_for_status()
-
-                                self.participant_urls[participant_code] = redirect_url
-
-                                # Parse the redirected page
-                                redirect_soup = BeautifulSoup(redirect_response.text, "html.parser")
-                                redirect_otree_data = redirect_soup.find("script", id="otree-data")
-
-                                # Check for form fields in the redirected page
-                                self.form_fields[participant_code] = []
-                                for field in redirect_soup.select("._formfield input"):
-                                    field_name = field.get("name")
-                                    if field_name:
-                                        self.form_fields[participant_code].append(str(field_name))
+                                # Fetch the redirected page and check for form fields
+                                (
+                                    participant.form_fields,
+                                    redirect_otree_data,
+                                ) = await self.fetch_otree_page(participant, redirect_url)
+                                redirect_url = participant.url
 
                                 # If the redirected page has form fields, it's a new task page
-                                if self.form_fields[participant_code] and redirect_otree_data:
+                                if participant.form_fields and redirect_otree_data:
                                     # Increment phase number
-                                    self.participant_phases[participant_code] += 1
-                                    phase_number = self.participant_phases[participant_code]
-
-                                    redirect_state_data = json.loads(redirect_otree_data.text)
-                                    redirect_state_data["phase"] = phase_number
-                                    redirect_state_data["required_fields"] = self.form_fields[
-                                        participant_code
-                                    ]
+                                    participant.phase += 1
+
+                                    redirect_state_data = orjson.loads(redirect_otree_data)
+                                    redirect_state_data["phase"] = participant.phase
+                                    redirect_state_data["required_fields"] = (
+                                        participant.form_fields
+                                    )
                                     await self.send_phase_update(
                                         participant_code, participant_id, redirect_state_data
                                     )
@@ -429,144 +557,132 @@ class OTreeBridge:
 
                                 # If not a task page, update current_url and continue navigating
                                 current_url = redirect_url
+                                wait_delay = 0.1
+                                etag = None
 
                             continue  # Keep navigating
                         else:
                             # No redirect, might be stuck
-                            logger.warning(f"No redirect from {next_url}")
+                            logger.warning("No redirect from %s", next_url)
                             return
 
                 # Handle wait pages
-                elif "oTree-Wait-Page" in response.headers:
-                    logger.info(f"Participant {participant_code} on wait page")
-                    await asyncio.sleep(2)
+                elif response.status == 304 or "oTree-Wait-Page" in response.headers:
+                    logger.debug("Participant %s on wait page", participant_code)
+                    etag = response.headers.get("ETag", etag)
+                    await asyncio.sleep(wait_delay)
+                    wait_delay = min(wait_delay * 2, 2.0)
                     continue
 
                 else:
-                    logger.warning(f"Unexpected response type for {participant_code}")
+                    logger.warning("Unexpected response type for %s", participant_code)
                     break
 
-            logger.warning(f"Navigation timed out for participant {participant_code}")
+            logger.warning("Navigation timed out for participant %s", participant_code)
 
         except Exception as e:
-            logger.exception(f"Error navigating experiment for {participant_code}: {e}")
+            logger.exception(
+                "Error navigating experiment for %s: %s", participant_code, e
+            )
 
     async def send_phase_update(
         self, participant_code: str, participant_id: int, state_data: dict
     ):
         """Send phase update to participant when entering a new action page."""
-        websocket = self.participant_connections.get(participant_code)
-        if not websocket:
+        participant = self.participants.get(participant_code)
+        if not participant:
             return
 
-        message = {
-            "type": "event",
-            "eventType": "phase-transition",
-            "data": {
-                "participant_id": participant_id,
-                **state_data,
-            },
-        }
-
-        try:
-            await websocket.send(json.dumps(message))
-            logger.info(
-                f"Sent phase update to participant {participant_code}: phase={state_data.get('phase')}"
-            )
-        except Exception as e:
-            logger.error(f"Failed to send phase update to {participant_code}: {e}")
+        message = encode_event(
+            PHASE_TRANSITION_PREFIX, {"participant_id": participant_id, **state_data}
+        )
+        participant.outbox.put_nowait(message)
+        logger.info(
+            "Sent phase update to participant %s: phase=%s",
+            participant_code,
+            state_data.get("phase"),
+        )
 
     async def send_game_state(
         self, participant_code: str, participant_id: int, state_data: dict
     ):
         """Send initial game state to participant."""
-        websocket = self.participant_connections.get(participant_code)
-        if not websocket:
+        participant = self.participants.get(participant_code)
+        if not participant:
             return
 
-        message = {
-            "type": "event",
-            "eventType": "round-started",
-            "data": {
-                "participant_id": participant_id,
-                **state_data,
-            },
-        }
-
-        try:
-            await websocket.send(json.dumps(message))
-            logger.info(f"Sent game state to participant {participant_code}")
-        except Exception as e:
-            logger.error(f"Failed to send game state to {participant_code}: {e}")
+        message = encode_event(
+            ROUND_STARTED_PREFIX, {"participant_id": participant_id, **state_data}
+        )
+        participant.outbox.put_nowait(message)
+        logger.info("Sent game state to participant %s", participant_code)
 
     async def send_results(
         self, participant_code: str, participant_id: int, results_data: dict
     ):
         """Send results to participant."""
-        websocket = self.participant_connections.get(participant_code)
-        if not websocket:
+        participant = self.participants.get(participant_code)
+        if not participant:
             return
 
-        message = {
-            "type": "event",
-            "eventType": "round-result",
-            "data": results_data,
-        }
-
-        try:
-            await websocket.send(json.dumps(message))
-            logger.info(f"Sent results to participant {participant_code}")
-        except Exception as e:
-            logger.error(f"Failed to send results to {participant_code}: {e}")
+        participant.outbox.put_nowait(encode_event(ROUND_RESULT_PREFIX, results_data))
+        logger.info("Sent results to participant %s", participant_code)
 
     async def send_game_completion(self, participant_code: str):
         """Send game completion event."""
-        websocket = self.participant_connections.get(participant_code)
-        if not websocket:
+        participant = self.participants.get(participant_code)
+        if not participant:
             return
 
-        message = {
-            "type": "event",
-            "eventType": "game-over",
-            "data": {"message": "Experiment completed"},
-        }
-
-        try:
-            await websocket.send(json.dumps(message))
-            logger.info(f"Sent game completion to participant {participant_code}")
-        except Exception as e:
-            logger.error(f"Failed to send game completion to {participant_code}: {e}")
+        participant.outbox.put_nowait(GAME_OVER_MESSAGE)
+        logger.info("Sent game completion to participant %s", participant_code)
+
+    async def write_messages(self, participant_code: str, participant: Participant):
+        """Send the participant's queued messages in order, one writer per connection."""
+        websocket = participant.websocket
+        outbox = participant.outbox
+        while True:
+            message = await outbox.get()
+            if message is None:
+                return
+            try:
+                await websocket.send(message)
+            except websockets.exceptions.ConnectionClosed:
+                return
+            except Exception as e:
+                logger.error("Failed to send message to %s: %s", participant_code, e)
+
+    async def send_error(
+        self,
+        websocket: ServerConnection,
+        error_message: str,
+        participant_code: Optional[str] = None,
+    ):
+        """Send error message to client, after any events already queued for it."""
+        message = orjson.dumps({"type": "error", "message": error_message})
+        participant = self.participants.get(participant_code or "")
+        if participant and participant.websocket is websocket:
+            participant.outbox.put_nowait(message)
+            return
 
-    async def send_error(self, websocket: ServerConnection, error_message: str):
-        """Send error message to client."""
-        message = {"type": "error", "message": error_message}
         try:
-            await websocket.send(json.dumps(message))
+            await websocket.send(message)
         except Exception as e:
-            logger.error(f"Failed to send error message: {e}")
+            logger.error("Failed to send error message: %s", e)
 
     async def cleanup_connection(
         self, websocket: ServerConnection, participant_code: Optional[str]
     ):
         """Clean up participant connection."""
         if participant_code:
-            if participant_code in self.participant_connections:
-                del self.participant_connections[participant_code]
-
-            if participant_code in self.participant_sessions:
-                self.participant_sessions[participant_code].close()
-                del self.participant_sessions[participant_code]
+            participant = self.participants.get(participant_code)
+            # A participant that rejoined on another connection is left alone
+            if participant and participant.websocket is websocket:
+                del self.participants[participant_code]
+                # Let the writer send what is already queued, then exit
+                participant.outbox.put_nowait(None)
 
-            if participant_code in self.participant_urls:
-                del self.participant_urls[participant_code]
-
-            if participant_code in self.participant_phases:
-                del self.participant_phases[participant_code]
-
-            if participant_code in self.form_fields:
-                del self.form_fields[participant_code]
-
-            logger.info(f"Cleaned up connection for participant {participant_code}")
+            logger.info("Cleaned up connection for participant %s", participant_code)
 
 
 async def main():
@@ -576,18 +692,35 @@ async def main():
     bridge_port = 8765
     otree_url = "http://localhost:8000"
 
-    logger.info(f"Starting oTree bridge server on {bridge_host}:{bridge_port}")
-    logger.info(f"Connecting to oTree server at {otree_url}")
+    logger.info("Starting oTree bridge server on %s:%s", bridge_host, bridge_port)
+    logger.info("Connecting to oTree server at %s", otree_url)
 
     bridge = OTreeBridge(otree_url=otree_url)
-
-    async with serve(bridge.handle_websocket, bridge_host, bridge_port):
-        logger.info("Bridge server running. Press Ctrl+C to stop.")
-        try:
-            await asyncio.Future()  # Run forever
-        except KeyboardInterrupt:
-            logger.info("Bridge server stopped.")
+    await bridge.start()
+
+    try:
+        # Events are small JSON documents, where per-message deflate costs more
+        # than it saves
+        async with serve(
+            bridge.handle_websocket,
+            bridge_host,
+            bridge_port,
+            compression=None,
+            max_size=2**20,
+        ):
+            logger.info("Bridge server running. Press Ctrl+C to stop.")
+            try:
+                await asyncio.Future()  # Run forever
+            except KeyboardInterrupt:
+                logger.info("Bridge server stopped.")
+    finally:
+        await bridge.close()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        import uvloop
+    except ImportError:  # uvloop is not available on Windows
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
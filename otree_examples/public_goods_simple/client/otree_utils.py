@@ -5,10 +5,24 @@ Shared between bridge server and game runner.
 import logging
 from typing import Optional
 
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 logger = logging.getLogger(__name__)
 
+# One pooled session for all REST calls, so repeated calls reuse the connection
+_session = requests.Session()
+_session.headers.update({"Content-Type": "application/json"})
+_adapter = HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.2),
+)
+_session.mount("http://", _adapter)
+_session.mount("https://", _adapter)
+
 
 def make_rest_api_call(
     otree_url: str, 
@@ -18,22 +32,20 @@ def make_rest_api_call(
     payload=None
 ):
     """Makes an authenticated REST API call to oTree."""
-    headers = {"Content-Type": "application/json"}
-    if rest_key:
-        headers["otree-rest-key"] = rest_key
+    headers = {"otree-rest-key": rest_key} if rest_key else None
     
     url = f"{otree_url}{endpoint}"
     
     try:
         if method.upper() == "POST":
-            response = requests.post(url, headers=headers, json=payload, timeout=10)
+            response = _session.post(url, headers=headers, json=payload, timeout=10)
         elif method.upper() == "GET":
-            response = requests.get(url, headers=headers, json=payload, timeout=10)
+            response = _session.get(url, headers=headers, json=payload, timeout=10)
         else:
             raise ValueError(f"Unsupported HTTP method: {method}")
         
         response.raise_for_status()
-        return response.json()
+        return orjson.loads(response.content)
     
     except requests.exceptions.RequestException as e:
         logger.error(f"Error during REST API call to {url}: {e}")
@@ -41,6 +53,11 @@ def make_rest_api_call(
             logger.error(f"Response content: {e.response.text}")
         raise
 
+    except orjson.JSONDecodeError as e:
+        logger.error(f"Invalid JSON in REST API response from {url}: {e}")
+        logger.error(f"Response content: {response.text}")
+        raise
+
 
 def create_otree_session(
     otree_url: str = "http://localhost:8000",
@@ -19,7 +19,8 @@ async def main():
 
     logger.info("Starting oTree Public Goods Game with econagents")
 
-    session_code, participants_info = create_otree_session()
+    # The REST helpers are blocking, so keep them off the event loop
+    session_code, participants_info = await asyncio.to_thread(create_otree_session)
     participant_configs = get_participant_configs(participants_info)
     logger.info(
         f"Successfully created oTree session {session_code} with {len(participant_configs)} participants"
@@ -66,4 +67,9 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        import uvloop
+    except ImportError:  # uvloop is not available on Windows
+        asyncio.run(main())
+    else:
+        uvloop.run(main())